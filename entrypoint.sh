@@ -1,6 +1,17 @@
 #!/bin/bash
 set -e
 
+# Google auth
+GOOGLE_APPLICATION_CREDENTIALS="${GOOGLE_APPLICATION_CREDENTIALS:-/secrets/gcp.json}"
+
+# Batch mode: the script itself picks up every /input/*.txt
+batch="$(echo "${BATCH_MODE:-false}" | tr '[:upper:]' '[:lower:]')"
+if [ "$batch" = "1" ] || [ "$batch" = "true" ] || [ "$batch" = "yes" ] || [ "$batch" = "y" ]; then
+  export GOOGLE_APPLICATION_CREDENTIALS
+  echo "Batch converting: /input/*.txt -> /output/"
+  exec python /app/tts_google.py
+fi
+
 INPUT_FILE="${INPUT_FILE}"
 
 # If INPUT_FILE not set, auto-detect first .txt file
@@ -13,9 +24,6 @@ if [ -z "$INPUT_FILE" ]; then
   exit 1
 fi
 
-# Google auth
-GOOGLE_APPLICATION_CREDENTIALS="${GOOGLE_APPLICATION_CREDENTIALS:-/secrets/gcp.json}"
-
 # Auto-generate output filename
 base="$(basename "$INPUT_FILE")"
 name="${base%.*}"
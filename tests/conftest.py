@@ -0,0 +1,63 @@
+"""
+Make tts_google importable without the GCP SDK.
+
+The tests only exercise local logic (chunking, output writing) with fake
+clients, so when google-cloud-texttospeech isn't installed we register a
+minimal stand-in for the few names tts_google touches at import time.
+"""
+import enum
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _install_gcp_stub():
+    google = sys.modules.setdefault("google", types.ModuleType("google"))
+    cloud = types.ModuleType("google.cloud")
+    api_core = types.ModuleType("google.api_core")
+    exceptions = types.ModuleType("google.api_core.exceptions")
+    texttospeech = types.ModuleType("google.cloud.texttospeech")
+
+    class GoogleAPICallError(Exception):
+        pass
+
+    for name in ("ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted", "InternalServerError"):
+        setattr(exceptions, name, type(name, (GoogleAPICallError,), {}))
+    exceptions.GoogleAPICallError = GoogleAPICallError
+
+    class AudioEncoding(enum.Enum):
+        LINEAR16 = 1
+        MP3 = 2
+        OGG_OPUS = 3
+        PCM = 7
+
+    class _Message:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    texttospeech.AudioEncoding = AudioEncoding
+    for name in (
+        "SynthesisInput", "VoiceSelectionParams", "AudioConfig", "StreamingSynthesizeRequest",
+        "StreamingSynthesizeConfig", "StreamingAudioConfig", "StreamingSynthesisInput",
+    ):
+        setattr(texttospeech, name, type(name, (_Message,), {}))
+    texttospeech.TextToSpeechClient = type("TextToSpeechClient", (), {})
+
+    google.cloud = cloud
+    google.api_core = api_core
+    cloud.texttospeech = texttospeech
+    api_core.exceptions = exceptions
+    sys.modules.update({
+        "google.cloud": cloud,
+        "google.cloud.texttospeech": texttospeech,
+        "google.api_core": api_core,
+        "google.api_core.exceptions": exceptions,
+    })
+
+
+try:
+    from google.cloud import texttospeech  # noqa: F401
+except ImportError:
+    _install_gcp_stub()
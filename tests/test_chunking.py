@@ -0,0 +1,123 @@
+"""
+Guards the incremental/prefix-sum chunker in split_text_sentence_aware against
+the original algorithm, which regenerated the full SSML for every candidate.
+The fast path relies on ssml_space_bytes being exact (it only looks at the last
+two characters of the previous piece), so any change to the break regexes must
+keep these tests green.
+"""
+import random
+
+import pytest
+
+import tts_google as tts
+
+
+def reference_split(raw_text):
+    """The baseline greedy chunker: measure every candidate by building it."""
+    txt = raw_text.replace("\r\n", "\n").replace("\r", "\n").strip()
+    if not txt:
+        return []
+    paragraphs = [p.strip() for p in txt.split("\n\n") if p.strip()]
+
+    def fits(candidate):
+        if tts.USE_SSML and tts.SSML_MODE == "auto":
+            return tts.ssml_bytes_for_text_chunk(candidate) <= tts.MAX_SSML_BYTES
+        return tts.utf8_len(candidate) <= tts.MAX_TEXT_BYTES
+
+    chunks = []
+    current = ""
+    for para in paragraphs:
+        candidate = (current + ("\n\n" if current else "") + para).strip()
+        if fits(candidate):
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        current = ""
+        if fits(para):
+            current = para
+            continue
+
+        sent_buf = ""
+        for s in tts.split_sentences(para):
+            candidate = (sent_buf + (" " if sent_buf else "") + s).strip()
+            if fits(candidate):
+                sent_buf = candidate
+                continue
+            if sent_buf:
+                chunks.append(sent_buf)
+                sent_buf = ""
+            if not fits(s):
+                wbuf = ""
+                for w in s.split():
+                    cand = (wbuf + (" " if wbuf else "") + w).strip()
+                    if fits(cand):
+                        wbuf = cand
+                    else:
+                        if wbuf:
+                            chunks.append(wbuf)
+                        wbuf = w
+                if wbuf:
+                    chunks.append(wbuf)
+            else:
+                sent_buf = s
+        if sent_buf:
+            chunks.append(sent_buf)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+WORDS = [
+    "alpha", "beta,", "gamma:", "delta;", "eps", "Dr.", "e.g.", "zéta", "—", "--", "-",
+    "<tag>", "&", "a&", "'quoted'", '"dq"', "wait!", "why?", "x" * 40,
+]
+
+
+def random_text(rng):
+    paras = []
+    for _ in range(rng.randint(1, 12)):
+        sentences = []
+        for _ in range(rng.randint(1, 40)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(1, 25))]
+            sep = rng.choice([" ", " ", "  ", "\n", " \t"])
+            sentences.append(sep.join(words) + rng.choice([".", "!", "?", "", ";", "--"]))
+        paras.append(rng.choice([" ", "  ", "\n"]).join(sentences))
+    return rng.choice(["\n\n", "\n\n\n", "\r\n\r\n"]).join(paras)
+
+
+@pytest.mark.parametrize("use_ssml", [True, False])
+@pytest.mark.parametrize("limit", [200, 400, 1000, 4700])
+def test_chunker_matches_reference(monkeypatch, use_ssml, limit):
+    monkeypatch.setattr(tts, "USE_SSML", use_ssml)
+    monkeypatch.setattr(tts, "SSML_MODE", "auto")
+    monkeypatch.setattr(tts, "MAX_SSML_BYTES", limit)
+    monkeypatch.setattr(tts, "MAX_TEXT_BYTES", limit)
+
+    rng = random.Random(limit * 2 + use_ssml)
+    for _ in range(60):
+        text = random_text(rng)
+        try:
+            expected = reference_split(text)
+        except RuntimeError:
+            expected = RuntimeError
+        try:
+            got = tts.split_text_sentence_aware(text)
+        except RuntimeError:
+            got = RuntimeError
+        assert got == expected
+
+
+def test_space_bytes_is_exact():
+    rng = random.Random(0)
+    alphabet = "ab ,.;:!?&<>\"'—-"
+    for _ in range(2000):
+        prev = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8))).strip() or "a"
+        nxt = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8))).strip() or "b"
+        joined = tts.utf8_len(tts.ssml_paragraph_body(prev + " " + nxt))
+        parts = (
+            tts.utf8_len(tts.ssml_paragraph_body(prev))
+            + tts.ssml_space_bytes(prev)
+            + tts.utf8_len(tts.ssml_paragraph_body(nxt))
+        )
+        assert joined == parts, (prev, nxt)
@@ -0,0 +1,141 @@
+"""
+synthesize_jobs: ordered write-out while chunks complete out of order,
+duplicate-chunk fan-out, cancellation on failure and atomic output files.
+"""
+import os
+import struct
+import threading
+import time
+import types
+
+import pytest
+
+import tts_google as tts
+
+MP3 = tts.texttospeech.AudioEncoding.MP3
+LINEAR16 = tts.texttospeech.AudioEncoding.LINEAR16
+
+
+class FakeClient:
+    """Returns each chunk's own text as its audio, after an optional per-chunk delay."""
+
+    def __init__(self, delays=None, fail_on=None):
+        self.delays = delays or {}
+        self.fail_on = fail_on
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, input, voice, audio_config, **kwargs):
+        text = input.text
+        with self._lock:
+            self.calls.append(text)
+        time.sleep(self.delays.get(text, 0))
+        if text == self.fail_on:
+            raise ValueError(f"synthesis failed for {text!r}")
+        return types.SimpleNamespace(audio_content=text.encode("utf-8"))
+
+
+@pytest.fixture(autouse=True)
+def plain_text_config(monkeypatch):
+    monkeypatch.setattr(tts, "USE_SSML", False)
+    monkeypatch.setattr(tts, "TTS_CACHE_DIR", "")
+    monkeypatch.setattr(tts, "TTS_CONCURRENCY", 4)
+
+
+def run(client, jobs, encoding=MP3):
+    tts.synthesize_jobs(client, None, None, encoding, jobs)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_output_is_in_chunk_order_when_chunks_finish_out_of_order(tmp_path):
+    chunks = [f"c{i}|" for i in range(8)]
+    # Earlier chunks take longer, so completion order is roughly reversed.
+    client = FakeClient(delays={c: 0.02 * (len(chunks) - i) for i, c in enumerate(chunks)})
+    out = str(tmp_path / "out.mp3")
+
+    run(client, [(chunks, out)])
+
+    assert read(out) == "".join(chunks).encode()
+    assert not os.path.exists(out + ".part")
+
+
+def test_wav_header_matches_streamed_data(tmp_path):
+    chunks = ["ab", "cdef", "gh"]
+    client = FakeClient(delays={"ab": 0.05})
+    out = str(tmp_path / "out.wav")
+
+    run(client, [(chunks, out)], encoding=LINEAR16)
+
+    data = read(out)
+    riff_size, = struct.unpack_from("<I", data, 4)
+    data_size, = struct.unpack_from("<I", data, 40)
+    assert data[44:] == b"abcdefgh"
+    assert data_size == 8
+    assert riff_size == 36 + 8
+
+
+def test_duplicate_chunks_are_synthesized_once_and_fanned_out(tmp_path):
+    out_a = str(tmp_path / "a.mp3")
+    out_b = str(tmp_path / "b.mp3")
+    jobs = [
+        (["intro|", "body-a|", "intro|"], out_a),
+        (["intro|", "body-b|"], out_b),
+    ]
+    client = FakeClient()
+
+    run(client, jobs)
+
+    assert sorted(client.calls) == ["body-a|", "body-b|", "intro|"]
+    assert read(out_a) == b"intro|body-a|intro|"
+    assert read(out_b) == b"intro|body-b|"
+
+
+def test_failure_cancels_queued_chunks_and_leaves_no_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_CONCURRENCY", 2)
+    chunks = [f"c{i}|" for i in range(40)]
+    client = FakeClient(delays={c: 0.02 for c in chunks[2:]}, fail_on="c1|")
+    out = str(tmp_path / "out.mp3")
+
+    with pytest.raises(ValueError):
+        run(client, [(chunks, out)])
+
+    # Only chunks already in flight when the failure surfaced may have run.
+    assert len(client.calls) < 10
+    assert os.listdir(tmp_path) == []
+
+
+def test_failure_keeps_previous_output_intact(tmp_path):
+    out = str(tmp_path / "out.mp3")
+    with open(out, "wb") as f:
+        f.write(b"previous run")
+    client = FakeClient(delays={"c2|": 0.05}, fail_on="c2|")
+
+    with pytest.raises(ValueError):
+        run(client, [(["c0|", "c1|", "c2|"], out)])
+
+    assert read(out) == b"previous run"
+    assert not os.path.exists(out + ".part")
+
+
+def test_atomic_output_renames_only_on_success(tmp_path):
+    out = str(tmp_path / "sub" / "out.bin")
+
+    with tts.atomic_output(out) as part_path:
+        assert part_path == out + ".part"
+        with open(part_path, "wb") as f:
+            f.write(b"ok")
+        assert not os.path.exists(out)
+    assert read(out) == b"ok"
+    assert not os.path.exists(part_path)
+
+    with pytest.raises(RuntimeError):
+        with tts.atomic_output(out) as part_path:
+            with open(part_path, "wb") as f:
+                f.write(b"partial")
+            raise RuntimeError("boom")
+    assert read(out) == b"ok"
+    assert not os.path.exists(part_path)
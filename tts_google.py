@@ -1,13 +1,28 @@
 import os
 import re
+import glob
 import html
-import wave
+import json
+import mmap
+import hashlib
+import time
+import threading
+import struct
 import tempfile
 import subprocess
-from typing import List
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 
+from google.api_core import exceptions as gexc
 from google.cloud import texttospeech
 
+try:
+    import pysbd
+except ImportError:  # optional: better sentence boundaries (abbreviations, decimals, ...)
+    pysbd = None
+
 
 # ----------------------------
 # Paths
@@ -15,6 +30,12 @@ from google.cloud import texttospeech
 INPUT_FILE = os.getenv("INPUT_FILE", "/input/input.txt")
 OUTPUT_FILE = os.getenv("OUTPUT_FILE", "/output/output.wav")
 
+# Batch mode: synthesize every INPUT_DIR/*.txt in one run, sharing one warm client
+# and one worker pool. Outputs go to OUTPUT_DIR/<name>.<ext>.
+BATCH_MODE = os.getenv("BATCH_MODE", "false").lower() in ("1", "true", "yes", "y")
+INPUT_DIR = os.getenv("INPUT_DIR", "/input")
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "/output")
+
 # ----------------------------
 # Voice
 # ----------------------------
@@ -26,6 +47,7 @@ VOICE_NAME = os.getenv("VOICE_NAME", "en-US-Neural2-J")
 # ----------------------------
 AUDIO_ENCODING = os.getenv("AUDIO_ENCODING", "LINEAR16").upper()
 SAMPLE_RATE_HZ = int(os.getenv("SAMPLE_RATE_HZ", "24000"))
+WAV_WRITE_BUFSZ = int(os.getenv("WAV_WRITE_BUFSZ", str(1 << 20)))
 
 # ----------------------------
 # Professor-style delivery
@@ -46,6 +68,14 @@ PROFESSOR_PROSODY = os.getenv("PROFESSOR_PROSODY", "false").lower() in ("1", "tr
 PROSODY_RATE = os.getenv("PROSODY_RATE", "88%")
 PROSODY_PITCH = os.getenv("PROSODY_PITCH", "-1st")
 
+# ----------------------------
+# Streaming
+# ----------------------------
+# StreamingSynthesize returns first audio much sooner than the unary RPC,
+# but only for streaming-capable voices (e.g. Chirp3-HD), plain text input
+# (no SSML) and raw PCM output. We only take this path for LINEAR16 + USE_SSML=false.
+USE_STREAMING = os.getenv("USE_STREAMING", "false").lower() in ("1", "true", "yes", "y")
+
 # ----------------------------
 # Hard limit handling
 # ----------------------------
@@ -54,16 +84,119 @@ PROSODY_PITCH = os.getenv("PROSODY_PITCH", "-1st")
 MAX_SSML_BYTES = int(os.getenv("MAX_SSML_BYTES", "4700"))
 MAX_TEXT_BYTES = int(os.getenv("MAX_TEXT_BYTES", "4700"))  # used when USE_SSML=false
 
+# ----------------------------
+# Concurrency / retries
+# ----------------------------
+# Chunks are independent network-bound RPCs, so we synthesize them in parallel.
+TTS_CONCURRENCY = max(1, int(os.getenv("TTS_CONCURRENCY", "8")))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "4"))
+TTS_RETRY_BASE_S = float(os.getenv("TTS_RETRY_BASE_S", "1.0"))
+
+# Optional on-disk cache of synthesized chunks, reused across runs (e.g. /cache).
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "")
+
+# Keep the gRPC channel warm so parallel calls share one multiplexed HTTP/2 connection.
+GRPC_KEEPALIVE_TIME_MS = int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "30000"))
+GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "10000"))
+TTS_WARMUP = os.getenv("TTS_WARMUP", "true").lower() in ("1", "true", "yes", "y")
+# The warmup result is thrown away; never let a slow one hold up the real work.
+TTS_WARMUP_TIMEOUT_S = float(os.getenv("TTS_WARMUP_TIMEOUT_S", "3.0"))
+
+# Transient errors worth retrying (latency spikes, throttling, server hiccups).
+RETRYABLE_ERRORS = (
+    gexc.ServiceUnavailable,
+    gexc.DeadlineExceeded,
+    gexc.ResourceExhausted,
+    gexc.InternalServerError,
+)
+
+# ----------------------------
+# SSML regexes (compiled once)
+# ----------------------------
+# Sentence endings: longer pause (lecture pacing)
+_SENT_RE = re.compile(r"([.!?])(\s+)")
+_SENT_REPL = f"\\1 <break time='{BREAK_MS}ms'/> "
+
+# Commas: short clarity pause
+_COMMA_RE = re.compile(r"(,)(\s+)")
+_COMMA_REPL = r"\1 <break time='120ms'/> "
+
+# Colons/semicolons: longer "setup" pause
+_COLON_RE = re.compile(r"([:;])(\s+)")
+_COLON_REPL = r"\1 <break time='220ms'/> "
+
+# Em-dash / double-dash: reflective pause
+_DASH_RE = re.compile(r"(\u2014|--)(\s+)")
+_DASH_REPL = r"\1 <break time='180ms'/> "
+
+# Constant SSML framing for this configuration; chunk sizing adds these as plain numbers.
+if PROFESSOR_PROSODY:
+    _P_OPEN = f"<p><prosody rate='{PROSODY_RATE}' pitch='{PROSODY_PITCH}'>"
+    _P_CLOSE = "</prosody></p>"
+else:
+    _P_OPEN = "<p>"
+    _P_CLOSE = "</p>"
+_PARA_JOINER = f"<break time='{PARA_BREAK_MS}ms'/>"
+
+_SPEAK_OVERHEAD = len("<speak></speak>".encode("utf-8"))
+_P_OVERHEAD = len((_P_OPEN + _P_CLOSE).encode("utf-8"))
+_PARA_JOINER_BYTES = len(_PARA_JOINER.encode("utf-8"))
+
+# Sentence splitter used by chunking (fallback when pysbd is unavailable)
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# auto: use pysbd when installed | regex: always use the simple regex above
+SENTENCE_SPLITTER = os.getenv("SENTENCE_SPLITTER", "auto").lower()
+
+_SEGMENTER = None
+if pysbd is not None and SENTENCE_SPLITTER != "regex":
+    try:
+        _SEGMENTER = pysbd.Segmenter(language=LANGUAGE_CODE.split("-")[0], clean=False)
+    except ValueError:
+        pass  # language not supported by pysbd
+
 
 def utf8_len(s: str) -> int:
     return len(s.encode("utf-8"))
 
 
+# Chunking may measure the same source sentence/word more than once (repeated
+# boilerplate); memoize sizes keyed by the source piece. Only the chunker uses
+# these, and main() clears them once chunking is done to bound memory.
+@lru_cache(maxsize=4096)
+def _text_piece_bytes(piece: str) -> int:
+    return utf8_len(piece)
+
+
+@lru_cache(maxsize=4096)
+def _ssml_piece_bytes(piece: str) -> int:
+    return utf8_len(ssml_paragraph_body(piece))
+
+
+_ASCII_WS = frozenset(b" \t\n\r\x0b\x0c")
+
+
 def read_text(path: str) -> str:
     if not os.path.isfile(path):
         raise FileNotFoundError(f"Input file not found at {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read().strip()
+    if os.path.getsize(path) == 0:
+        return ""
+    # Decode straight from the mapped file and trim surrounding whitespace by
+    # index first, so the only full-size allocation is the final str.
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            start, end = 0, len(mm)
+            while start < end and mm[start] in _ASCII_WS:
+                start += 1
+            while end > start and mm[end - 1] in _ASCII_WS:
+                end -= 1
+            with memoryview(mm) as view:
+                text = str(view[start:end], "utf-8")
+        finally:
+            mm.close()
+    # Non-ASCII whitespace (rare); a no-op returning the same object otherwise.
+    return text.strip()
 
 
 def ensure_parent_dir(path: str) -> None:
@@ -72,42 +205,62 @@ def ensure_parent_dir(path: str) -> None:
         os.makedirs(parent, exist_ok=True)
 
 
-def write_wav(path: str, pcm_bytes: bytes, sample_rate_hz: int) -> None:
-    ensure_parent_dir(path)
-    with wave.open(path, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate_hz)
-        wf.writeframes(pcm_bytes)
+# Canonical 44-byte header for mono 16-bit PCM WAV.
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
 
 
-def auto_text_to_ssml(text: str) -> str:
-    text = text.replace("\r\n", "\n").replace("\r", "\n").strip()
-    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+def wav_header(data_bytes: int, sample_rate_hz: int) -> bytes:
+    return _WAV_HEADER.pack(
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate_hz, sample_rate_hz * 2, 2, 16,
+        b"data", data_bytes,
+    )
 
-    ssml_paras = []
-    for p in paragraphs:
-        p = html.escape(p)
 
-        # Sentence endings: longer pause (lecture pacing)
-        p = re.sub(r"([.!?])(\s+)", rf"\1 <break time='{BREAK_MS}ms'/> ", p)
+@contextmanager
+def open_wav(path: str, sample_rate_hz: int, data_bytes: int = 0) -> Iterator[BinaryIO]:
+    """
+    Open a mono 16-bit WAV and yield the file for raw PCM writes.
+    The header is written up front for `data_bytes`; if a different amount
+    ends up written (e.g. streaming, size unknown) the two size fields are
+    patched on close. The file sits behind a large write buffer so many
+    small writes become a few big syscalls (matters on Docker bind mounts).
+    """
+    ensure_parent_dir(path)
+    with open(path, "wb", buffering=WAV_WRITE_BUFSZ) as f:
+        f.write(wav_header(data_bytes, sample_rate_hz))
+        yield f
+        written = f.tell() - _WAV_HEADER.size
+        if written != data_bytes:
+            f.seek(4)
+            f.write(struct.pack("<I", 36 + written))
+            f.seek(40)
+            f.write(struct.pack("<I", written))
+
+
+def ssml_paragraph_body(p: str) -> str:
+    """
+    Escape one paragraph (or piece of one) and insert the pacing breaks.
+    """
+    p = html.escape(p)
+    p = _SENT_RE.sub(_SENT_REPL, p)
+    p = _COMMA_RE.sub(_COMMA_REPL, p)
+    p = _COLON_RE.sub(_COLON_REPL, p)
+    p = _DASH_RE.sub(_DASH_REPL, p)
+    return p
 
-        # Commas: short clarity pause
-        p = re.sub(r"(,)(\s+)", r"\1 <break time='120ms'/> ", p)
 
-        # Colons/semicolons: longer "setup" pause
-        p = re.sub(r"([:;])(\s+)", r"\1 <break time='220ms'/> ", p)
+def wrap_ssml_paragraph(body: str) -> str:
+    return _P_OPEN + body + _P_CLOSE
 
-        # Em-dash / double-dash: reflective pause
-        p = re.sub(r"(\u2014|--)(\s+)", r"\1 <break time='180ms'/> ", p)
 
-        if PROFESSOR_PROSODY:
-            ssml_paras.append(f"<p><prosody rate='{PROSODY_RATE}' pitch='{PROSODY_PITCH}'>{p}</prosody></p>")
-        else:
-            ssml_paras.append(f"<p>{p}</p>")
+def auto_text_to_ssml(text: str) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n").strip()
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+
+    ssml_paras = [wrap_ssml_paragraph(ssml_paragraph_body(p)) for p in paragraphs]
 
-    joiner = f"<break time='{PARA_BREAK_MS}ms'/>"
-    return "<speak>" + joiner.join(ssml_paras) + "</speak>"
+    return "<speak>" + _PARA_JOINER.join(ssml_paras) + "</speak>"
 
 
 def build_synthesis_input(raw: str) -> texttospeech.SynthesisInput:
@@ -129,93 +282,188 @@ def ssml_bytes_for_text_chunk(text_chunk: str) -> int:
     return utf8_len(ssml)
 
 
+def fast_ssml_bytes(text_chunk: str) -> int:
+    """
+    Same value as ssml_bytes_for_text_chunk, but only the paragraph bodies are
+    generated; the constant framing is added as precomputed byte counts.
+    """
+    text = text_chunk.replace("\r\n", "\n").replace("\r", "\n").strip()
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    if not paragraphs:
+        return _SPEAK_OVERHEAD
+    body_bytes = sum(utf8_len(ssml_paragraph_body(p)) for p in paragraphs)
+    return (
+        _SPEAK_OVERHEAD
+        + len(paragraphs) * _P_OVERHEAD
+        + (len(paragraphs) - 1) * _PARA_JOINER_BYTES
+        + body_bytes
+    )
+
+
+def split_sentences(para: str) -> List[str]:
+    if _SEGMENTER is not None:
+        parts = _SEGMENTER.segment(para)
+    else:
+        parts = _SENT_SPLIT_RE.split(para)
+    return [s.strip() for s in parts if s.strip()]
+
+
+def ssml_space_bytes(prev: str) -> int:
+    """
+    SSML bytes produced by a single space joining `prev` to the next piece.
+    Only the last couple of characters of `prev` decide which break (if any)
+    the space turns into, so this is O(1) regardless of len(prev).
+    """
+    return _space_bytes_after(prev[-2:])
+
+
+@lru_cache(maxsize=4096)
+def _space_bytes_after(tail: str) -> int:
+    return utf8_len(ssml_paragraph_body(tail + " ")) - utf8_len(ssml_paragraph_body(tail))
+
+
 def split_text_sentence_aware(raw_text: str) -> List[str]:
     """
     SSML-aware chunking:
     - Split on paragraphs and sentences
     - Grow a chunk until the FINAL SSML bytes would exceed MAX_SSML_BYTES
+
+    Sizes are tracked incrementally: each paragraph/sentence/word is measured
+    once and joins add a known number of bytes, so we never rebuild the SSML
+    for the whole candidate chunk while growing it. Chunks are held as lists
+    of pieces and only joined into a string once, when emitted.
     """
     txt = raw_text.replace("\r\n", "\n").replace("\r", "\n").strip()
     if not txt:
         return []
 
-    # Sentence splitter
-    sentence_split_re = re.compile(r"(?<=[.!?])\s+")
-
     # Keep paragraphs as soft boundaries for more natural speech
     paragraphs = [p.strip() for p in txt.split("\n\n") if p.strip()]
 
-    chunks: List[str] = []
-    current = ""
+    ssml = USE_SSML and SSML_MODE == "auto"
+    limit = MAX_SSML_BYTES if ssml else MAX_TEXT_BYTES
 
-    def fits(candidate_text: str) -> bool:
-        if USE_SSML and SSML_MODE == "auto":
-            return ssml_bytes_for_text_chunk(candidate_text) <= MAX_SSML_BYTES
-        return utf8_len(candidate_text) <= MAX_TEXT_BYTES
+    # Fast path: most inputs fit in a single request. SSML only ever adds
+    # bytes, so the plain-text size is a cheap lower bound to try first.
+    whole = "\n\n".join(paragraphs)
+    if utf8_len(whole) <= limit and (not ssml or fast_ssml_bytes(whole) <= limit):
+        return [whole]
+
+    # Fixed bytes around a chunk / around each paragraph / between paragraphs.
+    if ssml:
+        frame_bytes = _SPEAK_OVERHEAD
+        para_frame_bytes = _P_OVERHEAD
+        para_sep_bytes = _PARA_JOINER_BYTES
+    else:
+        frame_bytes = 0
+        para_frame_bytes = 0
+        para_sep_bytes = len("\n\n")
+
+    def piece_bytes(piece: str) -> int:
+        if ssml:
+            return _ssml_piece_bytes(piece)
+        return _text_piece_bytes(piece)
+
+    def space_bytes(prev: str) -> int:
+        if ssml:
+            return ssml_space_bytes(prev)
+        return 1
+
+    def fits_chunk(body_bytes: int) -> bool:
+        # body_bytes: paragraphs incl. their wrappers and separators
+        return frame_bytes + body_bytes <= limit
+
+    def fits_para(body_bytes: int) -> bool:
+        # body_bytes: content of a single paragraph, without its wrapper
+        return frame_bytes + para_frame_bytes + body_bytes <= limit
+
+    def pack(pieces: List[str]) -> List[Tuple[List[str], bool]]:
+        """
+        Greedily pack space-joined pieces into paragraph-sized runs, left to right.
+        Returns (run, fits) pairs; fits=False means a single piece too big on its own.
+
+        Run sizes come from prefix sums, so each fit check is O(1), and the end
+        of each run is found by galloping + bisection in O(log K) checks.
+        """
+        # cum[k] = bytes of pieces[:k] including the space after each of them
+        cum = [0]
+        after: List[int] = []
+        for piece in pieces:
+            after.append(space_bytes(piece))
+            cum.append(cum[-1] + piece_bytes(piece) + after[-1])
+
+        def run_fits(a: int, b: int) -> bool:
+            return fits_para(cum[b] - cum[a] - after[b - 1])
+
+        runs: List[Tuple[List[str], bool]] = []
+        n = len(pieces)
+        a = 0
+        while a < n:
+            if not run_fits(a, a + 1):
+                runs.append((pieces[a:a + 1], False))
+                a += 1
+                continue
 
-    def try_add(cur: str, addition: str) -> bool:
-        candidate = (cur + ("\n\n" if cur else "") + addition).strip()
-        if not candidate:
-            return True
-        if fits(candidate):
-            return True
-        return False
+            # Gallop: double the run length until it stops fitting (or hits the end)...
+            good, bad, step = a + 1, n + 1, 1
+            while good < n:
+                probe = min(good + step, n)
+                if not run_fits(a, probe):
+                    bad = probe
+                    break
+                good = probe
+                step *= 2
+
+            # ...then bisect between the last fitting and first failing end.
+            while bad - good > 1:
+                mid = (good + bad) // 2
+                if run_fits(a, mid):
+                    good = mid
+                else:
+                    bad = mid
+
+            runs.append((pieces[a:good], True))
+            a = good
+        return runs
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_bytes = 0
 
     def flush():
-        nonlocal current
-        if current.strip():
-            chunks.append(current.strip())
-        current = ""
+        nonlocal current, current_bytes
+        if current:
+            chunks.append("\n\n".join(current))
+        current = []
+        current_bytes = 0
 
     for para in paragraphs:
+        para_bytes = para_frame_bytes + piece_bytes(para)
+
         # If the whole paragraph can be added, do it.
-        if try_add(current, para):
-            current = (current + ("\n\n" if current else "") + para).strip()
+        candidate = current_bytes + (para_sep_bytes if current else 0) + para_bytes
+        if fits_chunk(candidate):
+            current.append(para)
+            current_bytes = candidate
             continue
 
         # Paragraph doesn't fit with current. Flush current and handle paragraph by sentences.
         flush()
 
         # If paragraph alone fits, keep it.
-        if fits(para):
-            current = para
+        if fits_chunk(para_bytes):
+            current = [para]
+            current_bytes = para_bytes
             continue
 
-        # Split paragraph into sentences
-        sentences = [s.strip() for s in sentence_split_re.split(para) if s.strip()]
-        sent_buf = ""
-
-        for s in sentences:
-            candidate = (sent_buf + (" " if sent_buf else "") + s).strip()
-
-            if fits(candidate):
-                sent_buf = candidate
-                continue
-
-            # sentence doesn't fit into sent_buf; flush sent_buf
-            if sent_buf:
-                chunks.append(sent_buf)
-                sent_buf = ""
-
-            # If single sentence still doesn't fit, split by words as last resort
-            if not fits(s):
-                words = s.split()
-                wbuf = ""
-                for w in words:
-                    cand = (wbuf + (" " if wbuf else "") + w).strip()
-                    if fits(cand):
-                        wbuf = cand
-                    else:
-                        if wbuf:
-                            chunks.append(wbuf)
-                        wbuf = w
-                if wbuf:
-                    chunks.append(wbuf)
+        # Split paragraph into sentences; a sentence that doesn't fit on its
+        # own is split by words as last resort.
+        for run, ok in pack(split_sentences(para)):
+            if ok:
+                chunks.append(" ".join(run))
             else:
-                sent_buf = s
-
-        if sent_buf:
-            chunks.append(sent_buf)
+                # An oversized single word is emitted anyway; the safety check reports it.
+                chunks.extend(" ".join(words) for words, _ in pack(run[0].split()))
 
     flush()
 
@@ -241,21 +489,220 @@ def get_encoding() -> texttospeech.AudioEncoding:
     return texttospeech.AudioEncoding.LINEAR16
 
 
+def make_client() -> texttospeech.TextToSpeechClient:
+    """
+    Build a client on an explicit gRPC channel with keepalive, so the channel
+    is not torn down between sparse calls.
+    """
+    transport_cls = texttospeech.TextToSpeechClient.get_transport_class("grpc")
+    channel = transport_cls.create_channel(
+        options=[
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", -1),
+            ("grpc.keepalive_time_ms", GRPC_KEEPALIVE_TIME_MS),
+            ("grpc.keepalive_timeout_ms", GRPC_KEEPALIVE_TIMEOUT_MS),
+            # Without this, keepalive pings stop whenever no call is in flight. Google's
+            # frontends answer pings that come too often with GOAWAY "too_many_pings",
+            # so keep GRPC_KEEPALIVE_TIME_MS at tens of seconds.
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ],
+    )
+    return texttospeech.TextToSpeechClient(transport=transport_cls(channel=channel))
+
+
+def warm_up(
+    client: texttospeech.TextToSpeechClient,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+) -> None:
+    """
+    Pay the TLS + HTTP/2 handshake with a tiny request before the real work.
+    Failures are not fatal; the real calls have their own retries.
+    """
+    try:
+        client.synthesize_speech(
+            input=texttospeech.SynthesisInput(text="a"),
+            voice=voice,
+            audio_config=audio_config,
+            timeout=TTS_WARMUP_TIMEOUT_S,
+        )
+    except gexc.GoogleAPICallError as e:
+        print(f"Warmup request failed ({type(e).__name__}); continuing")
+
+
 def synthesize_one(
     client: texttospeech.TextToSpeechClient,
     voice: texttospeech.VoiceSelectionParams,
     audio_config: texttospeech.AudioConfig,
     chunk_text: str,
 ) -> bytes:
+    """
+    Synthesize a single chunk. Safe to call from worker threads:
+    the client is thread-safe and no other shared state is touched.
+    Transient API errors are retried with exponential backoff.
+    """
     synthesis_input = build_synthesis_input(chunk_text)
-    return client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice,
-        audio_config=audio_config,
-    ).audio_content
+    attempt = 0
+    while True:
+        try:
+            return client.synthesize_speech(
+                input=synthesis_input,
+                voice=voice,
+                audio_config=audio_config,
+            ).audio_content
+        except RETRYABLE_ERRORS as e:
+            if attempt >= TTS_MAX_RETRIES:
+                raise
+            delay = TTS_RETRY_BASE_S * (2 ** attempt)
+            attempt += 1
+            print(f"Transient TTS error ({type(e).__name__}); retry {attempt}/{TTS_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def synthesis_cache_key(chunk_text: str) -> str:
+    """
+    Everything that changes the audio for a chunk goes into the key.
+    """
+    cfg = [
+        LANGUAGE_CODE, VOICE_NAME, get_encoding().name, SPEAKING_RATE, PITCH, SAMPLE_RATE_HZ,
+        USE_SSML, SSML_MODE, BREAK_MS, PARA_BREAK_MS, PROFESSOR_PROSODY, PROSODY_RATE, PROSODY_PITCH,
+    ]
+    payload = chunk_text + "\0" + json.dumps(cfg)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
+def synthesize_cached(
+    client: texttospeech.TextToSpeechClient,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+    chunk_text: str,
+) -> bytes:
+    """
+    synthesize_one, backed by TTS_CACHE_DIR when it is set.
+    """
+    if not TTS_CACHE_DIR:
+        return synthesize_one(client, voice, audio_config, chunk_text)
 
-def ffmpeg_concat_audio(files: List[str], output_path: str) -> None:
+    path = os.path.join(TTS_CACHE_DIR, synthesis_cache_key(chunk_text) + ".bin")
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    audio_bytes = synthesize_one(client, voice, audio_config, chunk_text)
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio_bytes)
+    os.replace(tmp_path, path)
+    return audio_bytes
+
+
+def synthesize_stream(
+    client: texttospeech.TextToSpeechClient,
+    voice: texttospeech.VoiceSelectionParams,
+    chunk_text: str,
+) -> Iterator[bytes]:
+    """
+    Stream raw 16-bit mono PCM for a chunk as the API produces it.
+    """
+    config_req = texttospeech.StreamingSynthesizeRequest(
+        streaming_config=texttospeech.StreamingSynthesizeConfig(
+            voice=voice,
+            streaming_audio_config=texttospeech.StreamingAudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.PCM,
+                sample_rate_hertz=SAMPLE_RATE_HZ,
+            ),
+        )
+    )
+    input_req = texttospeech.StreamingSynthesizeRequest(
+        input=texttospeech.StreamingSynthesisInput(text=chunk_text),
+    )
+    for resp in client.streaming_synthesize(iter([config_req, input_req])):
+        yield resp.audio_content
+
+
+def synthesize_jobs(
+    client: texttospeech.TextToSpeechClient,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+    encoding: texttospeech.AudioEncoding,
+    jobs: List[Tuple[List[str], str]],
+) -> None:
+    """
+    Synthesize the chunks of every (chunks, output_path) job in one shared pool.
+    Audio is written out in chunk order while later chunks are still being
+    synthesized: whenever the next expected chunk of a file arrives, it and any
+    already-finished successors go straight to that file's sink.
+    Identical chunks (repeated boilerplate, within or across files) are
+    synthesized once and the audio is shared.
+    """
+    results: List[List[Optional[bytes]]] = [[None] * len(chunks) for chunks, _ in jobs]
+    next_idx = [0] * len(jobs)
+    sinks: List[Optional[Callable[[bytes], None]]] = [None] * len(jobs)
+    sink_stacks = [ExitStack() for _ in jobs]
+
+    # Sinks are the inner context so a failed run discards them before waiting
+    # on any chunks still in flight.
+    with ThreadPoolExecutor(max_workers=TTS_CONCURRENCY) as ex, ExitStack() as cleanup:
+        for st in sink_stacks:
+            cleanup.push(st)
+
+        by_text: Dict[str, Future] = {}
+        futures: Dict[Future, List[Tuple[int, int]]] = {}
+        for file_idx, (chunks, _) in enumerate(jobs):
+            for chunk_idx, c in enumerate(chunks):
+                f = by_text.get(c)
+                if f is None:
+                    f = ex.submit(synthesize_cached, client, voice, audio_config, c)
+                    by_text[c] = f
+                    futures[f] = []
+                futures[f].append((file_idx, chunk_idx))
+        del by_text
+
+        total = len(futures)
+        n_chunks = sum(len(chunks) for chunks, _ in jobs)
+        if total < n_chunks:
+            print(f"Skipping {n_chunks - total} duplicate chunk(s)")
+
+        done = 0
+        try:
+            for f in as_completed(futures):
+                audio_bytes = f.result()
+                done += 1
+                print(f"Processed chunk {done}/{total}")
+
+                # Pop so the Future (which holds the audio) can be freed once written.
+                for file_idx, chunk_idx in futures.pop(f):
+                    chunks, output_path = jobs[file_idx]
+                    parts = results[file_idx]
+                    parts[chunk_idx] = audio_bytes
+
+                    # Open the output as soon as the file has any audio.
+                    if sinks[file_idx] is None:
+                        sinks[file_idx] = sink_stacks[file_idx].enter_context(open_audio_sink(output_path, encoding))
+
+                    i = next_idx[file_idx]
+                    while i < len(parts) and parts[i] is not None:
+                        sinks[file_idx](parts[i])
+                        parts[i] = None  # written; drop our reference
+                        i += 1
+                    next_idx[file_idx] = i
+
+                    if i == len(chunks):
+                        sink_stacks[file_idx].close()
+                        print(f"Done! Audio saved to {output_path}")
+        except BaseException:
+            # Don't keep synthesizing (and paying for) queued chunks once the run has failed.
+            ex.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def ffmpeg_concat_audio(files: List[str], output_path: str, fmt: str) -> None:
+    """
+    Stitch per-chunk files with ffmpeg's concat demuxer, which offsets each
+    part's timestamps (plain byte-concatenation of Ogg streams would not).
+    """
     ensure_parent_dir(output_path)
     with tempfile.TemporaryDirectory() as td:
         list_path = os.path.join(td, "concat_list.txt")
@@ -270,6 +717,7 @@ def ffmpeg_concat_audio(files: List[str], output_path: str) -> None:
             "-safe", "0",
             "-i", list_path,
             "-c", "copy",
+            "-f", fmt,  # output may carry a temp suffix, so don't let ffmpeg guess from it
             output_path,
         ]
         proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -281,20 +729,113 @@ def ffmpeg_concat_audio(files: List[str], output_path: str) -> None:
             )
 
 
-def main() -> None:
-    raw = read_text(INPUT_FILE)
+@contextmanager
+def atomic_output(output_path: str) -> Iterator[str]:
+    """
+    Yield a temporary path next to output_path. It is moved into place only
+    once the body finishes cleanly, and removed if anything fails, so a failed
+    run never leaves a truncated file that looks complete.
+    """
+    ensure_parent_dir(output_path)
+    part_path = output_path + ".part"
+    try:
+        yield part_path
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, output_path)
+
+
+@contextmanager
+def open_audio_sink(output_path: str, encoding: texttospeech.AudioEncoding) -> Iterator[Callable[[bytes], None]]:
+    """
+    Yield a function that takes one chunk's audio at a time, in order; the
+    output file is finalized and moved into place on a clean exit.
+    """
+    with atomic_output(output_path) as part_path:
+        if encoding == texttospeech.AudioEncoding.LINEAR16:
+            # Total size isn't known yet; open_wav patches the header on close.
+            with open_wav(part_path, SAMPLE_RATE_HZ) as f:
+                yield f.write
+        elif encoding == texttospeech.AudioEncoding.MP3:
+            # MP3 is a plain sequence of frames, so chunk outputs can simply be appended.
+            with open(part_path, "wb") as f:
+                yield f.write
+        else:
+            # OGG_OPUS: each chunk is a complete Ogg stream with timestamps starting
+            # at 0, so keep them as separate files for the concat demuxer.
+            with tempfile.TemporaryDirectory() as td:
+                files: List[str] = []
+
+                def write_chunk(audio_bytes: bytes) -> None:
+                    fp = os.path.join(td, f"part_{len(files) + 1:04d}.ogg")
+                    with open(fp, "wb") as f:
+                        f.write(audio_bytes)
+                    files.append(fp)
+
+                yield write_chunk
+                ffmpeg_concat_audio(files, part_path, "ogg")
+
+
+def prepare_chunks(raw: str, label: str) -> List[str]:
     if not raw:
-        raise ValueError("Input text is empty.")
+        raise ValueError(f"Input text is empty: {label}")
 
     # Raw SSML is not chunked here (SSML-aware splitting is more complex).
     if USE_SSML and SSML_MODE == "raw":
         if utf8_len(raw) > 5000:
             raise ValueError(
-                "SSML_MODE=raw but your SSML is over the ~5000-byte Google limit. "
+                f"SSML_MODE=raw but your SSML in {label} is over the ~5000-byte Google limit. "
                 "Switch to SSML_MODE=auto (recommended), or shorten the SSML."
             )
 
-    client = texttospeech.TextToSpeechClient()
+    chunks = split_text_sentence_aware(raw)
+    if not chunks:
+        raise ValueError(f"Nothing to synthesize after splitting (input may be empty): {label}")
+
+    if USE_SSML and SSML_MODE == "auto":
+        debug_sizes = [fast_ssml_bytes(c) for c in chunks[:3]]
+        print(f"{label}: split into {len(chunks)} chunk(s) (MAX_SSML_BYTES={MAX_SSML_BYTES}); first sizes={debug_sizes}")
+    else:
+        debug_sizes = [utf8_len(c) for c in chunks[:3]]
+        print(f"{label}: split into {len(chunks)} chunk(s) (MAX_TEXT_BYTES={MAX_TEXT_BYTES}); first sizes={debug_sizes}")
+    return chunks
+
+
+def output_path_for(input_path: str, encoding: texttospeech.AudioEncoding) -> str:
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    if encoding == texttospeech.AudioEncoding.MP3:
+        ext = "mp3"
+    elif encoding == texttospeech.AudioEncoding.OGG_OPUS:
+        ext = "ogg"
+    else:
+        ext = "wav"
+    return os.path.join(OUTPUT_DIR, f"{name}.{ext}")
+
+
+def main() -> None:
+    if BATCH_MODE:
+        input_paths = sorted(glob.glob(os.path.join(INPUT_DIR, "*.txt")))
+        if not input_paths:
+            raise FileNotFoundError(f"No .txt files found in {INPUT_DIR}")
+    else:
+        input_paths = [INPUT_FILE]
+    texts = [read_text(p) for p in input_paths]
+
+    if BATCH_MODE:
+        # One empty file shouldn't abort the whole batch.
+        for p, raw in zip(input_paths, texts):
+            if not raw.strip():
+                print(f"Skipping empty input: {p}")
+        kept = [(p, raw) for p, raw in zip(input_paths, texts) if raw.strip()]
+        if not kept:
+            raise ValueError(f"All .txt files in {INPUT_DIR} are empty")
+        input_paths = [p for p, _ in kept]
+        texts = [raw for _, raw in kept]
+        del kept
+
+    client = make_client()
 
     voice = texttospeech.VoiceSelectionParams(
         language_code=LANGUAGE_CODE,
@@ -310,42 +851,46 @@ def main() -> None:
         sample_rate_hertz=SAMPLE_RATE_HZ if encoding == texttospeech.AudioEncoding.LINEAR16 else None,
     )
 
-    chunks = split_text_sentence_aware(raw)
-    if not chunks:
-        raise ValueError("Nothing to synthesize after splitting (input may be empty).")
+    # Warm the channel while we chunk.
+    warmup = None
+    if TTS_WARMUP:
+        warmup = threading.Thread(target=warm_up, args=(client, voice, audio_config), daemon=True)
+        warmup.start()
+
+    try:
+        all_chunks = [prepare_chunks(raw, p) for raw, p in zip(texts, input_paths)]
+    finally:
+        if warmup is not None:
+            warmup.join()
+    del texts
+    _text_piece_bytes.cache_clear()
+    _ssml_piece_bytes.cache_clear()
+    _space_bytes_after.cache_clear()
+
+    if BATCH_MODE:
+        jobs = [(chunks, output_path_for(p, encoding)) for chunks, p in zip(all_chunks, input_paths)]
+        if USE_STREAMING:
+            print("USE_STREAMING is ignored in BATCH_MODE; using synthesize_speech.")
+        synthesize_jobs(client, voice, audio_config, encoding, jobs)
+        return
 
-    if USE_SSML and SSML_MODE == "auto":
-        debug_sizes = [ssml_bytes_for_text_chunk(c) for c in chunks[:3]]
-        print(f"Split into {len(chunks)} chunk(s) (MAX_SSML_BYTES={MAX_SSML_BYTES}); first sizes={debug_sizes}")
-    else:
-        debug_sizes = [utf8_len(c) for c in chunks[:3]]
-        print(f"Split into {len(chunks)} chunk(s) (MAX_TEXT_BYTES={MAX_TEXT_BYTES}); first sizes={debug_sizes}")
+    chunks = all_chunks[0]
 
-    if encoding == texttospeech.AudioEncoding.LINEAR16:
-        combined_pcm = b""
-        for i, chunk in enumerate(chunks, 1):
-            print(f"Processing chunk {i}/{len(chunks)}")
-            combined_pcm += synthesize_one(client, voice, audio_config, chunk)
+    if encoding == texttospeech.AudioEncoding.LINEAR16 and USE_STREAMING and not USE_SSML:
+        # Streaming path: PCM frames go straight into the WAV file as they arrive.
+        with atomic_output(OUTPUT_FILE) as part_path, open_wav(part_path, SAMPLE_RATE_HZ) as f:
+            for i, chunk in enumerate(chunks, 1):
+                print(f"Streaming chunk {i}/{len(chunks)}")
+                for pcm in synthesize_stream(client, voice, chunk):
+                    f.write(pcm)
 
-        write_wav(OUTPUT_FILE, combined_pcm, SAMPLE_RATE_HZ)
         print(f"Done! Audio saved to {OUTPUT_FILE}")
         return
 
-    # MP3 / OGG_OPUS: stitch with ffmpeg
-    with tempfile.TemporaryDirectory() as td:
-        ext = "mp3" if encoding == texttospeech.AudioEncoding.MP3 else "ogg"
-        part_files: List[str] = []
-
-        for i, chunk in enumerate(chunks, 1):
-            print(f"Processing chunk {i}/{len(chunks)}")
-            audio_bytes = synthesize_one(client, voice, audio_config, chunk)
-            part_path = os.path.join(td, f"part_{i:04d}.{ext}")
-            with open(part_path, "wb") as f:
-                f.write(audio_bytes)
-            part_files.append(part_path)
+    if USE_STREAMING:
+        print("USE_STREAMING requires AUDIO_ENCODING=LINEAR16 and USE_SSML=false; using synthesize_speech instead.")
 
-        ffmpeg_concat_audio(part_files, OUTPUT_FILE)
-        print(f"Done! Audio saved to {OUTPUT_FILE}")
+    synthesize_jobs(client, voice, audio_config, encoding, [(chunks, OUTPUT_FILE)])
 
 
 if __name__ == "__main__":